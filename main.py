@@ -1,6 +1,9 @@
-import json
-import hashlib
+import functools
+import itertools
+import orjson
 import redis
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
 import numpy as np
 from tqdm import tqdm
 import argparse
@@ -8,7 +11,16 @@ from pathlib import Path
 import ollama
 import os
 from dotenv import load_dotenv
-from utils.helpers import load_pdf, load_json, load_pdf_with_ocr
+from redis.commands.search.field import TagField, TextField, VectorField
+from redis.commands.search.indexDefinition import IndexDefinition, IndexType
+from redis.commands.search.query import Query
+from utils.helpers import load_json, iter_pdf_chunks, sha256_of_file
+
+# Optional SIMD-accelerated similarity kernels (AVX2/AVX-512/NEON)
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
 
 # -------------------
 # Load environment variables
@@ -17,35 +29,166 @@ load_dotenv()
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 EMBED_MODEL = os.getenv("EMBED_MODEL", "nomic-embed-text")
 CHAT_MODEL = os.getenv("CHAT_MODEL", "llama2")
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+# Storage dtype for embeddings: "float32" (default), "float16" (half the
+# memory and network traffic) or "int8" (symmetric per-vector quantization;
+# 4x smaller payloads)
+EMBED_DTYPE = os.getenv("EMBED_DTYPE", "float32")
+if EMBED_DTYPE not in ("float32", "float16", "int8"):
+    # Fail fast: an unrecognized value would store float32 bytes but record
+    # the bogus name in {prefix}:meta, corrupting every later query
+    raise ValueError(
+        f"EMBED_DTYPE must be 'float32', 'float16' or 'int8', got {EMBED_DTYPE!r}"
+    )
 
 # -------------------
 # Redis connection
 # -------------------
 r = redis.from_url(REDIS_URL)
 
+# RediSearch index over all docs:* hashes (created lazily at first ingest)
+INDEX_NAME = "idx:docs"
+
+# Reuse one HTTP connection (keep-alive) for all embedding calls
+_ollama_session = requests.Session()
+
 # -------------------
 # Helpers
 # -------------------
 def compute_hash(file_path: str) -> str:
     """Create a hash of the file contents for cache invalidation."""
-    with open(file_path, "rb") as f:
-        return hashlib.sha256(f.read()).hexdigest()
+    return sha256_of_file(file_path)
+
+@functools.lru_cache(maxsize=1024)
+def _embed_cached(model: str, text: str) -> bytes:
+    """Embed one text via Ollama, memoized per (model, text) as raw bytes."""
+    response = ollama.embeddings(model=model, prompt=text)
+    return np.array(response["embedding"], dtype=np.float32).tobytes()
 
 def embed_text(text: str) -> np.ndarray:
-    """Get vector embedding using Ollama."""
-    response = ollama.embeddings(model=EMBED_MODEL, prompt=text)
-    return np.array(response["embedding"], dtype=np.float32)
+    """Get vector embedding using Ollama.
+
+    Repeated identical queries (common in the interactive loop) hit the
+    in-process cache instead of paying the Ollama round-trip again.
+    """
+    return np.frombuffer(_embed_cached(EMBED_MODEL, text), dtype=np.float32)
+
+def embed_texts(texts: list[str]) -> np.ndarray:
+    """Get vector embeddings for a batch of texts via Ollama's /api/embed.
+
+    Sends the whole batch in one HTTP request instead of one round-trip
+    per text. Falls back to per-item embedding on servers that predate
+    the batched endpoint.
+    """
+    response = _ollama_session.post(
+        f"{OLLAMA_HOST}/api/embed",
+        json={"model": EMBED_MODEL, "input": texts},
+    )
+    if response.status_code == 404:
+        # Server predates /api/embed; embed one at a time instead
+        return np.array([embed_text(t) for t in texts], dtype=np.float32)
+    response.raise_for_status()
+    embeddings = response.json().get("embeddings")
+    if not embeddings:
+        return np.array([embed_text(t) for t in texts], dtype=np.float32)
+    return np.array(embeddings, dtype=np.float32)
+
+def _ensure_search_index(redis_client, dim: int, vector_type: str = "FLOAT32"):
+    """Create the RediSearch HNSW index for docs:* hashes (no-op if it exists)."""
+    try:
+        redis_client.ft(INDEX_NAME).create_index(
+            fields=[
+                TextField("text"),
+                TagField("doc_hash"),
+                VectorField("vector", "HNSW", {
+                    "TYPE": vector_type,
+                    "DIM": dim,
+                    # Cosine, not IP: the docs:* prefix also picks up hashes
+                    # ingested before normalization, and cosine ranks those
+                    # correctly too while costing nothing on unit vectors
+                    "DISTANCE_METRIC": "COSINE",
+                }),
+            ],
+            definition=IndexDefinition(prefix=["docs:"], index_type=IndexType.HASH),
+        )
+    except redis.ResponseError as e:
+        if "already exists" not in str(e).lower():
+            raise
 
 def store_embeddings(redis_client, key_prefix, data):
-    """Store embeddings in Redis if not already present."""
-    for i, entry in enumerate(tqdm(data, desc="Embedding entries")):
+    """Store embeddings in Redis if not already present.
+
+    data may be a list or any iterable (e.g. a chunk generator); it is
+    consumed lazily one EMBED_BATCH_SIZE group at a time, so streaming
+    sources never have to materialize every chunk. Returns the number of
+    entries stored.
+    """
+    doc_hash = key_prefix.split(":", 1)[1]
+    index_ready = False
+    entries = iter(data)
+    n_batches = -(-len(data) // EMBED_BATCH_SIZE) if hasattr(data, "__len__") else None
+    progress = tqdm(total=n_batches, desc="Embedding batches")
+    start = 0
+    while True:
+        batch = list(itertools.islice(entries, EMBED_BATCH_SIZE))
+        if not batch:
+            break
         # Handle both string (PDF) and dict (JSON) entries
-        text = entry if isinstance(entry, str) else json.dumps(entry)
-        vector = embed_text(text)
-        redis_client.hset(f"{key_prefix}:{i}", mapping={
-            "text": text,
-            "vector": vector.tobytes()
-        })
+        texts = [entry if isinstance(entry, str) else orjson.dumps(entry).decode("utf-8") for entry in batch]
+        vectors = embed_texts(texts)
+        # Normalize once at ingest so every later comparison is a plain dot
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = np.divide(vectors, norms, out=vectors, where=norms != 0)
+        if EMBED_DTYPE == "int8":
+            # Symmetric per-vector quantization: 4x smaller, and the scale
+            # cancels in cosine so ranking can use the int8 codes directly
+            scales = np.abs(vectors).max(axis=1, keepdims=True) / 127.0
+            scales[scales == 0] = 1.0
+            stored = np.round(vectors / scales).astype(np.int8)
+        elif EMBED_DTYPE == "float16":
+            # Half the Redis memory and socket traffic; the query path is
+            # dominated by moving vector bytes, not arithmetic precision
+            stored = vectors.astype(np.float16)
+            scales = None
+        else:
+            stored = vectors
+            scales = None
+        if not index_ready:
+            # RediSearch vector fields support FLOAT32/FLOAT16 but not int8;
+            # int8 storage relies on the scan fallback instead
+            if EMBED_DTYPE in ("float32", "float16"):
+                try:
+                    _ensure_search_index(redis_client, vectors.shape[1],
+                                         EMBED_DTYPE.upper())
+                except redis.ResponseError:
+                    pass  # RediSearch module not loaded; queries fall back to a scan
+            index_ready = True
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.sadd("docs:index", key_prefix)
+        if start == 0:
+            # Storage metadata is identical for every entry of a document,
+            # so it lives once in {prefix}:meta rather than in each hash
+            pipe.hset(f"{key_prefix}:meta", mapping={
+                "dtype": EMBED_DTYPE,
+                "normalized": b"1"
+            })
+        for offset, (text, vector) in enumerate(zip(texts, stored)):
+            key = f"{key_prefix}:{start + offset}"
+            mapping = {
+                "text": text,
+                "vector": vector.tobytes(),
+                "doc_hash": doc_hash
+            }
+            if scales is not None:
+                mapping["scale"] = np.float32(scales[offset, 0]).tobytes()
+            pipe.hset(key, mapping=mapping)
+            pipe.sadd(f"{key_prefix}:keys", key)
+        pipe.execute()
+        start += len(batch)
+        progress.update(1)
+    progress.close()
+    return start
 
 def load_or_build_vectors(file_path: str, allow_ocr: bool = False):
     """Smartly load or build vectors from JSON or PDF."""
@@ -60,39 +203,95 @@ def load_or_build_vectors(file_path: str, allow_ocr: bool = False):
     # Load data based on file type
     file_path_obj = Path(file_path)
     if file_path_obj.suffix.lower() == '.pdf':
-        data = load_pdf(str(file_path_obj))
-        if (not data or len(data) == 0) and allow_ocr:
-            print("⚠️  No text extracted from PDF, trying OCR fallback...")
-            data = load_pdf_with_ocr(str(file_path_obj))
-        print(f"📄 Loaded {len(data) if data else 0} text chunks from PDF")
+        # Stream chunks straight into the embedder: chunking, embedding and
+        # Redis writes overlap instead of materializing every chunk first
+        print("⚡ Building embeddings...")
+        chunks = iter_pdf_chunks(str(file_path_obj), allow_ocr=allow_ocr)
+        stored = store_embeddings(r, key_prefix, chunks)
+        if not stored:
+            raise ValueError(f"No data could be extracted from {file_path_obj}")
+        print(f"📄 Embedded {stored} text chunks from PDF")
     else:
         data = load_json(str(file_path_obj))
         print(f"📄 Loaded {len(data) if data else 0} entries from JSON")
-
-    if not data:
-        raise ValueError(f"No data could be extracted from {file_path_obj}")
-
-    print("⚡ Building embeddings...")
-    store_embeddings(r, key_prefix, data)
+        if not data:
+            raise ValueError(f"No data could be extracted from {file_path_obj}")
+        print("⚡ Building embeddings...")
+        store_embeddings(r, key_prefix, data)
     return key_prefix
 
 def _iter_keys_for_prefixes(prefixes):
-    """Yield redis keys for given prefix(es)."""
+    """Yield redis keys for given prefix(es).
+
+    Reads the per-prefix registry sets maintained at ingest instead of
+    walking the whole keyspace with SCAN; legacy data without a registry
+    still falls back to pattern scans.
+    """
     if prefixes is None:
-        pattern = "docs:*:*"
-        for k in r.scan_iter(pattern):
-            yield k
+        members = {p.decode("utf-8") if isinstance(p, bytes) else p
+                   for p in r.smembers("docs:index")}
+        if not r.exists("docs:index:complete"):
+            # One-time sweep: documents ingested before the registry sets
+            # existed aren't in docs:index, so backfill their prefixes and
+            # mark the sweep done — later unscoped queries skip the scan
+            legacy = set()
+            for k in r.scan_iter("docs:*:*"):
+                if not k.endswith((b":keys", b":meta")):
+                    legacy.add(k.decode("utf-8").rsplit(":", 1)[0])
+            missing = legacy - members
+            if missing:
+                r.sadd("docs:index", *missing)
+            members |= legacy
+            r.set("docs:index:complete", 1)
+        if not members:
+            return
+        prefixes = sorted(members)
     elif isinstance(prefixes, str):
-        pattern = f"{prefixes}:*"
-        for k in r.scan_iter(pattern):
-            yield k
-    elif isinstance(prefixes, (list, tuple, set)):
-        for p in prefixes:
-            pattern = f"{p}:*"
-            for k in r.scan_iter(pattern):
-                yield k
-    else:
+        prefixes = [prefixes]
+    elif not isinstance(prefixes, (list, tuple, set)):
         return
+    for p in prefixes:
+        registry = f"{p}:keys"
+        if r.exists(registry):
+            yield from r.sscan_iter(registry, count=1000)
+        else:
+            for k in r.scan_iter(f"{p}:*"):
+                if not k.endswith((b":keys", b":meta")):
+                    yield k
+
+def _cosine_scores(q_vector: np.ndarray, M: np.ndarray) -> np.ndarray:
+    """Batched cosine similarity of one query vector against the rows of M."""
+    if simsimd is not None:
+        # simsimd wants matching dtypes; float16 rows use the native f16 kernels
+        q = q_vector.astype(M.dtype, copy=False)
+        return 1.0 - np.asarray(simsimd.cdist(q.reshape(1, -1), M, metric="cosine"))[0]
+    # Hoisted query self-dot, per-row self-dots via einsum, one sqrt per row
+    q_self = float(np.vdot(q_vector, q_vector))
+    dots = M @ q_vector
+    denoms = np.sqrt(np.einsum("ij,ij->i", M, M) * q_self)
+    return np.divide(dots, denoms, out=np.zeros_like(dots), where=denoms != 0)
+
+def _query_knn(key_prefixes, q_vector, top_k):
+    """Server-side ANN search via RediSearch (FT.SEARCH KNN): one round-trip."""
+    prefilter = "*"
+    if key_prefixes:
+        if isinstance(key_prefixes, str):
+            key_prefixes = [key_prefixes]
+        hashes = [p.split(":", 1)[1] for p in key_prefixes]
+        prefilter = "@doc_hash:{%s}" % "|".join(hashes)
+    q = (
+        Query(f"{prefilter}=>[KNN {top_k} @vector $vec AS score]")
+        .sort_by("score")
+        .return_fields("text", "score")
+        .paging(0, top_k)  # Query defaults to LIMIT 0 10, capping larger top_k
+        .dialect(2)
+    )
+    # The query blob must match the index's vector type
+    if EMBED_DTYPE == "float16":
+        q_vector = q_vector.astype(np.float16)
+    res = r.ft(INDEX_NAME).search(q, query_params={"vec": q_vector.tobytes()})
+    # RediSearch reports cosine distance; convert back to similarity
+    return [(1.0 - float(doc.score), doc.text) for doc in res.docs]
 
 def query_redis(key_prefixes, query, top_k=3):
     """Search Redis for closest notes to query.
@@ -101,31 +300,105 @@ def query_redis(key_prefixes, query, top_k=3):
       - string -> single namespace
       - list -> multiple namespaces
     """
+    # An empty prefix collection means "no namespaces", not "all docs" —
+    # without this the KNN prefilter would degrade to * and search everything
+    if key_prefixes is not None and not key_prefixes and not isinstance(key_prefixes, str):
+        return []
+
     q_vector = embed_text(query)
+    q_norm = np.linalg.norm(q_vector)
+    if q_norm:
+        q_vector = q_vector / q_norm
+
+    # Prefer the server-side vector index; fall back to a full scan when the
+    # RediSearch module or index is unavailable. An empty KNN result also
+    # falls through: it can mean the scoped docs simply aren't indexed
+    # (int8 storage, or legacy entries without the doc_hash tag) rather
+    # than that nothing matches.
+    try:
+        results = _query_knn(key_prefixes, q_vector, top_k)
+        if results:
+            return results
+    except redis.ResponseError:
+        pass
 
-    scores = []
+    keys = []
     seen_keys = set()
     for key in _iter_keys_for_prefixes(key_prefixes):
-        if key in seen_keys:
-            continue
-        seen_keys.add(key)
-        entry = r.hgetall(key)
-        if not entry:
-            continue
-        text = entry.get(b"text")
-        vector_bin = entry.get(b"vector")
-        if not text or not vector_bin:
-            continue
-        text = text.decode("utf-8")
-        vector = np.frombuffer(vector_bin, dtype=np.float32)
-
-        # cosine similarity
-        denom = (np.linalg.norm(q_vector) * np.linalg.norm(vector))
-        score = float(np.dot(q_vector, vector) / denom) if denom != 0 else 0.0
-        scores.append((score, text))
-
-    scores.sort(reverse=True, key=lambda x: x[0])
-    return scores[:top_k]
+        if key not in seen_keys:
+            seen_keys.add(key)
+            keys.append(key)
+
+    # Group keys by document so storage metadata is fetched once per doc
+    groups = {}
+    for key in keys:
+        groups.setdefault(key.rsplit(b":", 1)[0], []).append(key)
+
+    pipe = r.pipeline(transaction=False)
+    for prefix in groups:
+        pipe.hmget(prefix + b":meta", "dtype", "normalized")
+    metas = dict(zip(groups, pipe.execute()))
+
+    texts = []
+    vec_bufs = []
+    buf_dtypes = []
+    all_normalized = True
+    # Fetch hashes in pipelined chunks instead of one HGETALL round-trip each
+    for prefix, group_keys in groups.items():
+        meta_dtype, meta_norm = metas[prefix]
+        has_meta = meta_dtype is not None
+        # With per-document metadata each entry fetch only moves text+vector;
+        # entries written before the meta key carry the fields themselves
+        fields = ("text", "vector") if has_meta else ("text", "vector", "normalized", "dtype")
+        for start in range(0, len(group_keys), 500):
+            pipe = r.pipeline(transaction=False)
+            for key in group_keys[start:start + 500]:
+                pipe.hmget(key, *fields)
+            for row in pipe.execute():
+                text, vector_bin = row[0], row[1]
+                if not text or not vector_bin:
+                    continue
+                normalized = meta_norm if has_meta else row[2]
+                dtype = meta_dtype if has_meta else row[3]
+                if not normalized:
+                    all_normalized = False
+                texts.append(text.decode("utf-8"))
+                vec_bufs.append(vector_bin)
+                buf_dtypes.append(dtype.decode("utf-8") if dtype else "float32")
+
+    if not texts:
+        return []
+
+    # One contiguous (N, d) matrix, then a single batched similarity pass
+    d = q_vector.shape[0]
+    if len(set(buf_dtypes)) == 1:
+        M = np.frombuffer(b"".join(vec_bufs), dtype=np.dtype(buf_dtypes[0])).reshape(-1, d)
+    else:
+        # Mixed storage dtypes (e.g. legacy float32 next to int8): upcast each
+        M = np.vstack([np.frombuffer(b, dtype=np.dtype(dt)).astype(np.float32)
+                       for b, dt in zip(vec_bufs, buf_dtypes)])
+        all_normalized = False
+
+    if M.dtype == np.int8:
+        # Per-vector quantization scales cancel in cosine, so rank on the
+        # int8 codes directly (integer kernels when simsimd is available)
+        if simsimd is not None:
+            q_scale = float(np.abs(q_vector).max()) / 127.0
+            q_i8 = (np.round(q_vector / q_scale) if q_scale else q_vector).astype(np.int8)
+            sims = 1.0 - np.asarray(simsimd.cdist(q_i8.reshape(1, -1), M, metric="cosine"))[0]
+        else:
+            sims = _cosine_scores(q_vector, M.astype(np.float32))
+    elif all_normalized:
+        # Pre-normalized vectors: cosine collapses to a dot product
+        sims = M @ q_vector
+    else:
+        sims = _cosine_scores(q_vector, M)
+
+    # Partial top-k selection instead of a full sort
+    k = min(top_k, len(texts))
+    top = np.argpartition(sims, -k)[-k:]
+    top = top[np.argsort(sims[top])[::-1]]
+    return [(float(sims[i]), texts[i]) for i in top]
 
 def ask(query, key_prefixes=None):
     """Run a query and pass context to LLM.
@@ -168,16 +441,30 @@ if __name__ == "__main__":
                 break
             # allow comma-separated
             paths = [p.strip() for p in inp.split(",") if p.strip()]
+            valid = []
             for p in paths:
-                try:
-                    if not Path(p).exists():
-                        print(f"❌ Path not found: {p}")
-                        continue
-                    prefix = load_or_build_vectors(p, allow_ocr=allow_ocr)
-                    if prefix not in loaded_prefixes:
-                        loaded_prefixes.append(prefix)
-                except Exception as e:
-                    print(f"❌ Failed to load {p}: {e}")
+                if not Path(p).exists():
+                    print(f"❌ Path not found: {p}")
+                else:
+                    valid.append(p)
+            if not valid:
+                continue
+            # Load files concurrently: each file's disk reads, Ollama HTTP
+            # calls and Redis writes are I/O-bound, so while one file waits
+            # on the embedding endpoint another can be hashing or writing
+            with ThreadPoolExecutor(max_workers=min(4, len(valid))) as executor:
+                futures = {
+                    executor.submit(load_or_build_vectors, p, allow_ocr=allow_ocr): p
+                    for p in valid
+                }
+                for future in as_completed(futures):
+                    p = futures[future]
+                    try:
+                        prefix = future.result()
+                        if prefix not in loaded_prefixes:
+                            loaded_prefixes.append(prefix)
+                    except Exception as e:
+                        print(f"❌ Failed to load {p}: {e}")
 
     while True:
         print("\nSelect an option:")
@@ -1,17 +1,20 @@
-import json
 import hashlib
+import orjson
 from typing import Any, List, Dict
 from PyPDF2 import PdfReader
 from .text_splitter import TextSplitter
-from .pdf_loader import load_pdf_with_ocr
+from .pdf_loader import load_pdf_with_ocr, iter_pdf_chunks
 
 
 def sha256_of_file(path: str) -> str:
-    h = hashlib.sha256()
     with open(path, "rb") as f:
+        if hasattr(hashlib, "file_digest"):
+            # Python >= 3.11: hashes in C without a Python-level read loop
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        h = hashlib.sha256()
         for chunk in iter(lambda: f.read(8192), b""):
             h.update(chunk)
-    return h.hexdigest()
+        return h.hexdigest()
 
 
 def load_json(path: str, json_key: str | None = None) -> List[Dict[str, Any]]:
@@ -19,8 +22,8 @@ def load_json(path: str, json_key: str | None = None) -> List[Dict[str, Any]]:
     If the file is a dict and json_key is provided, returns that list.
     If it's already a list, return it as-is.
     """
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    with open(path, "rb") as f:
+        data = orjson.loads(f.read())
     if isinstance(data, list):
         return data
     if isinstance(data, dict):
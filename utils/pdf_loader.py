@@ -1,5 +1,7 @@
-from typing import List
+from typing import List, Tuple
 import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from PyPDF2 import PdfReader
 from .text_splitter import TextSplitter
 
@@ -8,58 +10,121 @@ from pdf2image import convert_from_path
 import pytesseract
 
 
+def _extract_page_text(path: str, page_index: int) -> Tuple[int, str]:
+    """Extract the embedded text of one PDF page.
+
+    Runs inside a worker process, so it opens its own PdfReader.
+    Returns (page_index, text) so pages can be reassembled in order.
+    """
+    reader = PdfReader(path)
+    return page_index, reader.pages[page_index].extract_text() or ""
+
+
+def iter_pdf_chunks(
+    path: str,
+    poppler_path: str = r"D:\My Coding Projects\Poppler\poppler-25.07.0\Library\bin",
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+    allow_ocr: bool = False
+):
+    """Yield semantic chunks of a PDF page by page.
+
+    Streaming counterpart of load_pdf_with_ocr: chunks come out as each
+    page's text is extracted, so embedding can start before the whole
+    document has been parsed and peak memory stays at one page of text plus
+    the splitter's carry-over instead of every chunk at once. Pages without
+    embedded text are OCR'd from a single whole-document rasterization,
+    performed lazily the first time a page needs it.
+    """
+    splitter = TextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    reader = PdfReader(path)
+    images = None
+    carry = ""
+    for i, page in enumerate(reader.pages):
+        text = page.extract_text() or ""
+
+        if not text.strip() and allow_ocr:
+            if convert_from_path is None or pytesseract is None:
+                print("pdf2image or pytesseract not available; skipping OCR.")
+            else:
+                if images is None:
+                    print(f"No embedded text in page {i+1}, rasterizing document for OCR...")
+                    try:
+                        images = convert_from_path(
+                            path,
+                            poppler_path=poppler_path,
+                            thread_count=os.cpu_count()
+                        )
+                    except Exception as e:
+                        print(f"Error rasterizing PDF for OCR: {str(e)}")
+                        images = []
+                if i < len(images):
+                    text = pytesseract.image_to_string(images[i])
+
+        if not text.strip():
+            continue
+
+        combined = f"{carry}\n\n{text}" if carry else text
+        # Match the eager loader: prefer section-aligned chunks, falling
+        # back to size-based splitting when no headers are found
+        pieces = splitter.split_by_section(combined)
+        if len(pieces) <= 1:
+            pieces = splitter.split_text(combined)
+        # Hold back the last piece: the next page's text may extend it
+        carry = pieces.pop() if pieces else ""
+        yield from pieces
+
+    if carry.strip():
+        yield carry
+
+
 def load_pdf_with_ocr(
     path: str,
-    poppler_path: str = r"D:\My Coding Projects\Poppler\poppler-25.07.0\Library\bin", 
+    poppler_path: str = r"D:\My Coding Projects\Poppler\poppler-25.07.0\Library\bin",
     chunk_size: int = 1000,
     chunk_overlap: int = 200
 ) -> List[str]:
     """Extract text from PDF using OCR if needed and split into semantic chunks."""
     print(f"Processing PDF: {path}")
-    
-    # First try normal text extraction
-    reader = PdfReader(path)
-    pages_text = []
-    
-    for i, page in enumerate(reader.pages):
-        text = page.extract_text()
-        
-        # If no text found, try OCR
-        if not text.strip():
-            print(f"No embedded text in page {i+1}, trying OCR...")
-            
-            # Check OCR dependencies
-            if convert_from_path is None or pytesseract is None:
-                print("pdf2image or pytesseract not available; skipping OCR.")
-                continue
-                
+
+    # Fan embedded-text extraction out across CPU cores
+    n_pages = len(PdfReader(path).pages)
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        texts = dict(executor.map(partial(_extract_page_text, path), range(n_pages)))
+
+    # OCR any pages without embedded text. Rasterize the whole document with
+    # one poppler invocation instead of launching pdftoppm once per page —
+    # the process startup dominates per-page conversion on scanned PDFs.
+    missing = [i for i in range(n_pages) if not texts[i].strip()]
+    if missing:
+        if convert_from_path is None or pytesseract is None:
+            print("pdf2image or pytesseract not available; skipping OCR.")
+        else:
+            print(f"No embedded text in {len(missing)} page(s), trying OCR...")
             try:
-                # Convert PDF page to image
-                images = convert_from_path(
+                all_images = convert_from_path(
                     path,
-                    first_page=i+1,
-                    last_page=i+1,
-                    poppler_path=poppler_path
+                    poppler_path=poppler_path,
+                    thread_count=os.cpu_count()
                 )
-                
-                if images:
-                    # Extract text from image using OCR
-                    text = pytesseract.image_to_string(images[0])
-                    print(f"OCR extracted {len(text)} characters")
-                else:
-                    print(f"Could not convert page {i+1} to image")
-                    continue
-                    
             except Exception as e:
-                print(f"Error during OCR for page {i+1}: {str(e)}")
-                continue
-        
-        # Add page text if we got any
-        if text.strip():
-            pages_text.append(text)
-            print(f"Added page {i+1} with {len(text)} characters")
-        
-    print(f"\nExtracted text from {len(pages_text)}/{len(reader.pages)} pages")
+                print(f"Error rasterizing PDF for OCR: {str(e)}")
+                all_images = []
+            if all_images:
+                # pytesseract shells out to tesseract, so threads are enough
+                # to keep one OCR process per core busy
+                with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                    ocr_texts = executor.map(
+                        pytesseract.image_to_string,
+                        [all_images[i] for i in missing]
+                    )
+                for i, text in zip(missing, ocr_texts):
+                    print(f"OCR extracted {len(text)} characters from page {i+1}")
+                    texts[i] = text
+
+    pages_text = [texts[i] for i in range(n_pages) if texts[i].strip()]
+
+    print(f"\nExtracted text from {len(pages_text)}/{n_pages} pages")
     
     # Create a text splitter instance
     splitter = TextSplitter(
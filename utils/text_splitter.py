@@ -1,7 +1,23 @@
 """Text splitting utilities for semantic chunking."""
 import re
+from bisect import bisect_right
+from itertools import accumulate
 from typing import List
 
+# Compiled once at import; _clean_text runs these on every document
+_RE_MULTI_NL = re.compile(r'\n{2,}')
+_RE_SINGLE_NL = re.compile(r'(?<!\n)\n(?!\n)')
+_RE_WS = re.compile(r'[ \t]+')
+_RE_PERIOD_CAP = re.compile(r'\.(?=[A-Z])')
+
+# Common section header patterns, combined into one alternation so
+# split_by_section finds every header in a single pass
+_SECTION_RE = re.compile('|'.join([
+    r'\n[A-Z][A-Z ]{2,}[A-Z]\n',  # ALL CAPS HEADERS
+    r'\n\d+\.\s+[A-Z][^.]+\n',     # Numbered sections
+    r'\n[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*:\s*\n'  # Title Case Headers:
+]))
+
 class TextSplitter:
     def __init__(
         self,
@@ -22,36 +38,37 @@ class TextSplitter:
         segments = text.split(self.separator)
         segments = [s.strip() for s in segments if s.strip()]
         
-        # Initialize chunks
+        # Initialize chunks; segment lengths are tracked alongside so overlap
+        # selection never re-measures strings
         chunks = []
         current_chunk = []
+        current_lens = []
         current_size = 0
-        
-        for segment in segments:
+
+        for segment, seg_len in ((s, len(s)) for s in segments):
             # If adding this segment would exceed chunk size and we have content
-            if current_size + len(segment) > self.chunk_size and current_chunk:
+            if current_size + seg_len > self.chunk_size and current_chunk:
                 # Join the current chunk and add it to chunks
                 chunks.append(self._join_chunk(current_chunk))
                 # Start new chunk with overlap
-                if self.chunk_overlap > 0 and current_chunk:
-                    # Keep the last segment(s) that fit within overlap
-                    overlap_size = 0
-                    overlap_segments = []
-                    for seg in reversed(current_chunk):
-                        if overlap_size + len(seg) <= self.chunk_overlap:
-                            overlap_segments.insert(0, seg)
-                            overlap_size += len(seg)
-                        else:
-                            break
-                    current_chunk = overlap_segments
-                    current_size = overlap_size
+                if self.chunk_overlap > 0:
+                    # Keep the longest run of trailing segments that fits the
+                    # overlap budget: cumulative suffix sums + one bisect
+                    # instead of walking the chunk backwards
+                    suffix_sums = list(accumulate(reversed(current_lens)))
+                    keep = bisect_right(suffix_sums, self.chunk_overlap)
+                    current_chunk = current_chunk[len(current_chunk) - keep:]
+                    current_lens = current_lens[len(current_lens) - keep:]
+                    current_size = suffix_sums[keep - 1] if keep else 0
                 else:
                     current_chunk = []
+                    current_lens = []
                     current_size = 0
-            
+
             # Add the segment to the current chunk
             current_chunk.append(segment)
-            current_size += len(segment)
+            current_lens.append(seg_len)
+            current_size += seg_len
         
         # Add the last chunk if it has content
         if current_chunk:
@@ -64,21 +81,19 @@ class TextSplitter:
         # Normalize line endings first
         text = text.replace('\r\n', '\n').replace('\r', '\n')
 
-        # Collapse 3+ newlines into exactly two (preserve paragraph separators)
-        text = re.sub(r'\n{3,}', '\n\n', text)
+        # Collapse 2+ newlines into exactly two (preserve paragraph separators);
+        # doing this up front makes a second normalization pass unnecessary
+        text = _RE_MULTI_NL.sub('\n\n', text)
 
         # Turn single newlines (line-wraps) into spaces but keep double-newline paragraph separators
         # (?<!\n)\n(?!\n) matches a single newline not preceded or followed by another newline
-        text = re.sub(r'(?<!\n)\n(?!\n)', ' ', text)
+        text = _RE_SINGLE_NL.sub(' ', text)
 
         # Replace multiple spaces/tabs with a single space
-        text = re.sub(r'[ \t]+', ' ', text)
+        text = _RE_WS.sub(' ', text)
 
         # Fix broken sentences where a period is immediately followed by a capital letter
-        text = re.sub(r'\.(?=[A-Z])', '. ', text)
-
-        # Normalize any remaining runs of 2+ newlines to exactly two
-        text = re.sub(r'\n{2,}', '\n\n', text)
+        text = _RE_PERIOD_CAP.sub('. ', text)
 
         return text.strip()
 
@@ -88,25 +103,20 @@ class TextSplitter:
 
     def split_by_section(self, text: str) -> List[str]:
         """Split text by section headers and major theme changes."""
-        # Common section header patterns
-        section_patterns = [
-            r'\n[A-Z][A-Z ]{2,}[A-Z]\n',  # ALL CAPS HEADERS
-            r'\n\d+\.\s+[A-Z][^.]+\n',     # Numbered sections
-            r'\n[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*:\s*\n'  # Title Case Headers:
-        ]
-        
-        # Combine patterns
-        split_pattern = '|'.join(section_patterns)
-        
-        # Split by sections while keeping the headers
-        sections = re.split(f'({split_pattern})', text)
-        
-        # Recombine header with its content
+        # Walk header matches directly and slice the original string —
+        # no intermediate split list to allocate
         chunks = []
-        for i in range(0, len(sections)-1, 2):
-            header = sections[i].strip()
-            content = sections[i+1].strip() if i+1 < len(sections) else ""
-            if header or content:
-                chunks.append(f"{header}\n\n{content}".strip())
-        
+        prev_end = 0
+        for m in _SECTION_RE.finditer(text):
+            before = text[prev_end:m.start()].strip()
+            header = m.group().strip()
+            if before or header:
+                chunks.append(f"{before}\n\n{header}".strip())
+            prev_end = m.end()
+
+        # Text after the last header
+        tail = text[prev_end:].strip()
+        if tail:
+            chunks.append(tail)
+
         return chunks
\ No newline at end of file